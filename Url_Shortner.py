@@ -1,23 +1,163 @@
-from flask import Flask, redirect, request, url_for
-import random
+from flask import Flask, redirect, request
+import os
 import string
-from pymongo import MongoClient
+import time
+from functools import lru_cache
+from pymongo import MongoClient, ReturnDocument
+import redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
 
 
 MONGO_URI = "mongodb://localhost:27017/"
 DATABASE_NAME = "url_shortener_db"
-
-
-client = MongoClient(MONGO_URI)
-db = client[DATABASE_NAME]
-links_collection = db["links"]
+# Prefix for generated short links; set this to the public URL in production
+BASE_URL = os.environ.get("BASE_URL", "http://127.0.0.1:5000/").rstrip("/") + "/"
+
+# Short links are immutable, so redirects can be cached by browsers and CDNs
+REDIRECT_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+# New link ids start at 62**5 so their base62 codes are 6+ characters and can
+# never collide with the 5-character random codes of older links
+LINK_ID_START = 62 ** 5
+
+# Local Redis shared by all workers, caching code -> long_url between the
+# per-process LRU and MongoDB. A Unix socket skips the TCP stack entirely.
+REDIS_SOCKET = os.environ.get("REDIS_SOCKET", "/var/run/redis.sock")
+REDIS_TTL = 86400
+# After a failed connect, skip Redis for this many seconds so a dead cache
+# costs one connect attempt per worker instead of one per request
+REDIS_RETRY_AFTER = 5
+
+# Pool sized for per-worker concurrency, with short timeouts so an unreachable
+# server fails a request after ~2s instead of stalling the worker for 30s
+MONGO_CLIENT_OPTIONS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 10,
+    'serverSelectionTimeoutMS': 2000,
+    'socketTimeoutMS': 2000,
+    'connectTimeoutMS': 2000,
+    'retryWrites': True,
+    'w': 1,
+}
+
+
+def connect_to_mongo():
+    # MongoClient is not fork-safe: gunicorn calls this again in each worker
+    # (see post_fork in gunicorn.conf.py) when the app is preloaded
+    global client, db, links_collection, counters_collection
+    client = MongoClient(MONGO_URI, **MONGO_CLIENT_OPTIONS)
+    db = client[DATABASE_NAME]
+    links_collection = db["links"]
+    counters_collection = db["counters"]
+
+
+connect_to_mongo()
+
+# Unique index on the random codes of older links; sparse since new links have none
+links_collection.create_index("code", unique=True, sparse=True)
+
+# Raise the counter to LINK_ID_START ($max is a no-op once it's past that)
+counters_collection.update_one({'_id': 'links'}, {'$max': {'seq': LINK_ID_START - 1}}, upsert=True)
+
+# redis-py resets its pool after fork, so one module-level client is safe under gunicorn
+# redis-py retries 3 times with backoff by default; a missing socket should fail once, fast
+redis_client = redis.Redis(
+    unix_socket_path=REDIS_SOCKET,
+    decode_responses=True,
+    socket_timeout=0.5,
+    socket_connect_timeout=0.5,
+    retry=Retry(NoBackoff(), 0),
+)
+_redis_down_until = 0.0
+
+
+def _cache_get(key):
+    global _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return None
+    try:
+        return redis_client.get(key)
+    except (redis.ConnectionError, redis.TimeoutError):
+        _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+    except redis.RedisError:
+        pass
+    return None
+
+
+def _cache_set(key, value):
+    global _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return
+    try:
+        redis_client.setex(key, REDIS_TTL, value)
+    except (redis.ConnectionError, redis.TimeoutError):
+        _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+    except redis.RedisError:
+        pass
 
 
 app = Flask(__name__)
 
 
-def generate_code(length=5):
-    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+
+def encode_base62(n):
+    out = []
+    while n:
+        n, r = divmod(n, 62)
+        out.append(BASE62_ALPHABET[r])
+    return "".join(reversed(out)) or "0"
+
+
+def decode_base62(code):
+    n = 0
+    for char in code:
+        n = n * 62 + BASE62_ALPHABET.index(char)
+    # Anything past a signed 64-bit int can't be a link id (and can't be sent as BSON)
+    if n >= 2 ** 63:
+        raise ValueError(code)
+    return n
+
+
+def next_link_id():
+    counter = counters_collection.find_one_and_update(
+        {'_id': 'links'},
+        {'$inc': {'seq': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['seq']
+
+
+@lru_cache(maxsize=10000)
+def _resolve(code):
+    # Shared cache first; if Redis is down just fall through to Mongo
+    cache_key = f"c:{code}"
+    long_url = _cache_get(cache_key)
+    if long_url is not None:
+        return long_url
+
+    # New links are keyed by the integer id encoded in the code, which hits the _id index
+    mapping = None
+    try:
+        link_id = decode_base62(code)
+    except ValueError:
+        link_id = None
+    # Only the canonical encoding is an id: "0001" or any old 5-character code
+    # must not be read as the id it happens to decode to
+    if link_id is not None and encode_base62(link_id) == code:
+        mapping = links_collection.find_one({'_id': link_id}, projection={'long_url': 1, '_id': 0})
+    if mapping is None:
+        # Links created before the switch to ids still carry a random code
+        mapping = links_collection.find_one({'code': code}, projection={'long_url': 1, '_id': 0})
+    if mapping is None:
+        # Raise instead of returning None so misses are never cached
+        raise KeyError(code)
+
+    _cache_set(cache_key, mapping['long_url'])
+    return mapping['long_url']
 
 
 @app.route("/", methods=["GET"])
@@ -37,31 +177,32 @@ def shorten():
         return "URL parameter missing", 400
 
 
-    code = generate_code()
-    while links_collection.find_one({'code': code}):
-        code = generate_code()
-
-    
-    link_document = {
-        'code': code,
+    link_id = next_link_id()
+    links_collection.insert_one({
+        '_id': link_id,
         'long_url': long_url
-    }
-    links_collection.insert_one(link_document)
+    })
+    code = encode_base62(link_id)
 
 
-    short_link = url_for('redirect_to_url', code=code, _external=True)
+    short_link = f"{BASE_URL}{code}"
 
     return f'Short URL: <a href="{short_link}">{short_link}</a>'
 
 
 @app.route('/<code>')
 def redirect_to_url(code):
-    mapping = links_collection.find_one({'code': code})
-    if mapping:
-        return redirect(mapping['long_url'])
-    
-    return "URL not found", 404
+    try:
+        long_url = _resolve(code)
+    except KeyError:
+        return "URL not found", 404
+
+    # Links are never edited or deleted, so let browsers and proxies cache the redirect
+    response = redirect(long_url, code=301)
+    response.headers['Cache-Control'] = REDIRECT_CACHE_CONTROL
+    return response
 
 
 if __name__== "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    print("Development server only. In production run: gunicorn -c gunicorn.conf.py Url_Shortner:app")
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
\ No newline at end of file
@@ -1,20 +1,119 @@
 from flask import Flask, redirect, request, url_for, render_template_string, flash
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from pymongo import MongoClient
-import random
+from werkzeug.security import check_password_hash
+from pymongo import MongoClient, ReturnDocument
+import redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+import os
 import string
+import time
+import bcrypt
+from functools import lru_cache
+
+try:
+    import gevent
+    import gevent.monkey
+except ImportError:
+    # Only needed under gunicorn's gevent workers; the dev server runs without it
+    gevent = None
 
 MONGO_URI = "mongodb://localhost:27017/"
 DATABASE_NAME = "url_shortener_db"
+# Prefix for generated short links; set this to the public URL in production
+BASE_URL = os.environ.get("BASE_URL", "http://127.0.0.1:5000/").rstrip("/") + "/"
+
+# Short links are immutable, so redirects can be cached by browsers and CDNs
+REDIRECT_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+# New link ids start at 62**5 so their base62 codes are 6+ characters and can
+# never collide with the 5-character random codes of older links
+LINK_ID_START = 62 ** 5
+
+# Local Redis shared by all workers, caching code -> long_url between the
+# per-process LRU and MongoDB. A Unix socket skips the TCP stack entirely.
+REDIS_SOCKET = os.environ.get("REDIS_SOCKET", "/var/run/redis.sock")
+REDIS_TTL = 86400
+# After a failed connect, skip Redis for this many seconds so a dead cache
+# costs one connect attempt per worker instead of one per request
+REDIS_RETRY_AFTER = 5
+
+# Signs the session cookie. There is deliberately no default: with a key
+# committed to the repo anyone could forge a login cookie for any user.
+SECRET_KEY = os.environ.get("SECRET_KEY")
+if not SECRET_KEY:
+    raise RuntimeError("The SECRET_KEY environment variable must be set to a long random value.")
+
+# Pool sized for per-worker concurrency, with short timeouts so an unreachable
+# server fails a request after ~2s instead of stalling the worker for 30s
+MONGO_CLIENT_OPTIONS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 10,
+    'serverSelectionTimeoutMS': 2000,
+    'socketTimeoutMS': 2000,
+    'connectTimeoutMS': 2000,
+    'retryWrites': True,
+    'w': 1,
+}
+
+def connect_to_mongo():
+    """(Re)creates the Mongo client; gunicorn calls this again in each forked worker."""
+    global client, db, links_collection, users_collection, counters_collection
+    client = MongoClient(MONGO_URI, **MONGO_CLIENT_OPTIONS)
+    db = client[DATABASE_NAME]
+    links_collection = db["links"]
+    users_collection = db["users"]
+    counters_collection = db["counters"]
+
+connect_to_mongo()
+
+# Unique index on the random codes of older links; sparse since new links have none
+links_collection.create_index("code", unique=True, sparse=True)
+
+# Raise the counter to LINK_ID_START ($max is a no-op once it's past that)
+counters_collection.update_one({'_id': 'links'}, {'$max': {'seq': LINK_ID_START - 1}}, upsert=True)
+
+# redis-py resets its pool after fork, so one module-level client is safe under gunicorn
+# redis-py retries 3 times with backoff by default; a missing socket should fail once, fast
+redis_client = redis.Redis(
+    unix_socket_path=REDIS_SOCKET,
+    decode_responses=True,
+    socket_timeout=0.5,
+    socket_connect_timeout=0.5,
+    retry=Retry(NoBackoff(), 0),
+)
+_redis_down_until = 0.0
+
+
+def _cache_get(key):
+    """Reads from Redis, returning None if it is down or backing off."""
+    global _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return None
+    try:
+        return redis_client.get(key)
+    except (redis.ConnectionError, redis.TimeoutError):
+        _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+    except redis.RedisError:
+        pass
+    return None
+
+
+def _cache_set(key, value):
+    """Writes to Redis, silently skipping it if it is down or backing off."""
+    global _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return
+    try:
+        redis_client.setex(key, REDIS_TTL, value)
+    except (redis.ConnectionError, redis.TimeoutError):
+        _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+    except redis.RedisError:
+        pass
 
-client = MongoClient(MONGO_URI)
-db = client[DATABASE_NAME]
-links_collection = db["links"]
-users_collection = db["users"]
 
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'a_secure_random_key_for_sessions'
+app.config['SECRET_KEY'] = SECRET_KEY
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -36,9 +135,104 @@ def load_user(user_id):
         return User(user_data['username'], user_data['password'])
     return None
 
-def generate_code(length=5):
-    """Generates a random 5-character short code."""
-    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+def encode_base62(n):
+    """Encodes a non-negative integer id as a short code."""
+    out = []
+    while n:
+        n, r = divmod(n, 62)
+        out.append(BASE62_ALPHABET[r])
+    return "".join(reversed(out)) or "0"
+
+def decode_base62(code):
+    """Decodes a short code back to its integer id, raising ValueError if it isn't one."""
+    n = 0
+    for char in code:
+        n = n * 62 + BASE62_ALPHABET.index(char)
+    # Anything past a signed 64-bit int can't be a link id (and can't be sent as BSON)
+    if n >= 2 ** 63:
+        raise ValueError(code)
+    return n
+
+def next_link_id():
+    """Atomically allocates the next link id from the counters collection."""
+    counter = counters_collection.find_one_and_update(
+        {'_id': 'links'},
+        {'$inc': {'seq': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['seq']
+
+
+@lru_cache(maxsize=10000)
+def _resolve(code):
+    """Looks up the long URL for a short code, caching hits in-process."""
+    # Shared cache first; if Redis is down just fall through to Mongo
+    cache_key = f"c:{code}"
+    long_url = _cache_get(cache_key)
+    if long_url is not None:
+        return long_url
+
+    # New links are keyed by the integer id encoded in the code, which hits the _id index
+    mapping = None
+    try:
+        link_id = decode_base62(code)
+    except ValueError:
+        link_id = None
+    # Only the canonical encoding is an id: "0001" or any old 5-character code
+    # must not be read as the id it happens to decode to
+    if link_id is not None and encode_base62(link_id) == code:
+        mapping = links_collection.find_one({'_id': link_id}, projection={'long_url': 1, '_id': 0})
+    if mapping is None:
+        # Links created before the switch to ids still carry a random code
+        mapping = links_collection.find_one({'code': code}, projection={'long_url': 1, '_id': 0})
+    if mapping is None:
+        # Raise instead of returning None so misses are never cached
+        raise KeyError(code)
+
+    _cache_set(cache_key, mapping['long_url'])
+    return mapping['long_url']
+
+
+def _calibrate_bcrypt_rounds(target_seconds=0.25):
+    """Picks the largest bcrypt cost (10-14) whose hash still fits in target_seconds."""
+    rounds = 10
+    for candidate in range(10, 15):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds=candidate))
+        if time.perf_counter() - start > target_seconds:
+            break
+        rounds = candidate
+    return rounds
+
+BCRYPT_ROUNDS = _calibrate_bcrypt_rounds()
+
+def hash_password(password):
+    """Hashes a password with bcrypt at the calibrated cost."""
+    # bcrypt only looks at the first 72 bytes; truncate explicitly so newer
+    # bcrypt releases don't raise on long passwords
+    return bcrypt.hashpw(password.encode()[:72], bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+def verify_password(stored_hash, password):
+    """Checks a password in constant time, accepting legacy werkzeug hashes."""
+    if stored_hash.startswith("$2"):
+        return bcrypt.checkpw(password.encode()[:72], stored_hash.encode())
+    # Accounts registered before the switch to bcrypt
+    return check_password_hash(stored_hash, password)
+
+# Verified against when the username doesn't exist, so a miss costs as much as a hit
+DUMMY_HASH = hash_password("x")
+
+def run_blocking(func, *args):
+    """Runs slow CPU-bound work (password hashing) without stalling other requests."""
+    # Under gevent workers a direct call blocks the hub, and with it every request
+    # on the worker. gevent's own threadpool uses real OS threads, and bcrypt
+    # releases the GIL, so the hub keeps serving while the hash runs.
+    if gevent is not None and gevent.monkey.is_module_patched("socket"):
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
 
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -53,7 +247,7 @@ def register():
         if users_collection.find_one({"username": username}):
             flash('Username already taken!', 'error')
         else:
-            hashed_password = generate_password_hash(password)
+            hashed_password = run_blocking(hash_password, password)
             users_collection.insert_one({"username": username, "password": hashed_password})
             flash('Registration successful. Please log in.', 'success')
             return redirect(url_for('login'))
@@ -80,9 +274,10 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         user_data = users_collection.find_one({"username": username})
+        stored_hash = user_data['password'] if user_data else DUMMY_HASH
 
-        if user_data and check_password_hash(user_data['password'], password):
-            user = load_user(username)
+        if run_blocking(verify_password, stored_hash, password) and user_data:
+            user = User(user_data['username'], user_data['password'])
             login_user(user)
             flash('Logged in successfully!', 'success')
             return redirect(url_for('home'))
@@ -144,18 +339,15 @@ def shorten():
         flash("URL parameter missing", 'error')
         return redirect(url_for('home'))
 
-    code = generate_code()
-    while links_collection.find_one({'code': code}):
-        code = generate_code()
-
-    link_document = {
-        'code': code,
+    link_id = next_link_id()
+    links_collection.insert_one({
+        '_id': link_id,
         'long_url': long_url,
         'created_by': current_user.username 
-    }
-    links_collection.insert_one(link_document)
-    
-    short_link = url_for('redirect_to_url', code=code, _external=True)
+    })
+    code = encode_base62(link_id)
+
+    short_link = f"{BASE_URL}{code}"
 
     
     flash(f'Short URL created: <a href="{short_link}">{short_link}</a>', 'success')
@@ -164,13 +356,17 @@ def shorten():
 
 @app.route('/<code>')
 def redirect_to_url(code):
-    mapping = links_collection.find_one({'code': code})
-    if mapping:
-        return redirect(mapping['long_url'])
-        
-    return "URL not found", 404
+    try:
+        long_url = _resolve(code)
+    except KeyError:
+        return "URL not found", 404
 
+    # Links are never edited or deleted, so let browsers and proxies cache the redirect
+    response = redirect(long_url, code=301)
+    response.headers['Cache-Control'] = REDIRECT_CACHE_CONTROL
+    return response
 
-if __name__== "__main__":
 
-    app.run(debug=True)
+if __name__== "__main__":
+    print("Development server only. In production run: gunicorn -c gunicorn.conf.py autentication:app")
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
@@ -1,48 +1,147 @@
 import uvicorn
 from fastapi import FastAPI, Request, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pymongo import MongoClient
-from werkzeug.security import generate_password_hash, check_password_hash
-import random
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from werkzeug.security import check_password_hash
+import asyncio
 import string
+import time
+import bcrypt
 import os
-from jinja2 import Environment, DictLoader 
+import logging
+from collections import OrderedDict
+from jinja2 import Environment, DictLoader, Template
+from itsdangerous import URLSafeSerializer, TimestampSigner, BadSignature
+import redis
+import redis.asyncio
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
 
 # --- 1. CONFIGURATION & MONGODB SETUP ---
 
 MONGO_URI = "mongodb://localhost:27017/" 
 DATABASE_NAME = "url_shortener_db"
+# Prefix for generated short links; set this to the public URL in production
+BASE_URL = os.environ.get("BASE_URL", "http://127.0.0.1:8000/").rstrip("/") + "/"
+
+# Short links are immutable, so redirects can be cached by browsers and CDNs
+REDIRECT_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+# New link ids start at 62**5 so their base62 codes are 6+ characters and can
+# never collide with the 5-character random codes of older links
+LINK_ID_START = 62 ** 5
+
+# Local Redis shared by all workers, caching code -> long_url between the
+# per-process LRU and MongoDB. A Unix socket skips the TCP stack entirely.
+REDIS_SOCKET = os.environ.get("REDIS_SOCKET", "/var/run/redis.sock")
+REDIS_TTL = 86400
+# After a failed connect, skip Redis for this many seconds so a dead cache
+# costs one connect attempt per worker instead of one per request
+REDIS_RETRY_AFTER = 5
+
+# Signs the session and flash cookies. There is deliberately no default: with a
+# key committed to the repo anyone could forge a login cookie for any user.
+SECRET_KEY = os.environ.get("SECRET_KEY")
+if not SECRET_KEY:
+    raise RuntimeError("The SECRET_KEY environment variable must be set to a long random value.")
+
+logger = logging.getLogger(__name__)
+
+# Pool sized for per-worker concurrency, with short timeouts so an unreachable
+# server fails a request after ~2s instead of stalling the worker for 30s
+MONGO_CLIENT_OPTIONS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 10,
+    'serverSelectionTimeoutMS': 2000,
+    'socketTimeoutMS': 2000,
+    'connectTimeoutMS': 2000,
+    'retryWrites': True,
+    'w': 1,
+}
 
-# Initialize MongoDB variables outside try block
+# Initialize MongoDB variables; they are populated by the startup handler
 client = None
 db = None
 links_collection = None
 users_collection = None
+counters_collection = None
 is_db_connected = False
 
-try:
-    # Attempt to connect to MongoDB
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000) # 5 second timeout
-    # The ismaster command is cheap and does not require auth.
-    client.admin.command('ismaster') 
-    
-    db = client[DATABASE_NAME]
-    links_collection = db["links"]
-    users_collection = db["users"]
-    
-    # Ensure a unique index for username
-    if 'username' not in users_collection.index_information():
-        users_collection.create_index("username", unique=True)
-        
-    is_db_connected = True
-    print("SUCCESS: Connected to MongoDB.")
-        
-except Exception as e:
-    # This print statement shows up in your terminal, helping diagnose the 500 error
-    print(f"ERROR: Failed to connect to MongoDB at {MONGO_URI}. Please ensure MongoDB is running.")
-    print(f"Details: {e}")
-    # is_db_connected remains False
+async def connect_to_mongo():
+    """Builds the async Mongo client on startup so it binds to the running event loop."""
+    global client, db, links_collection, users_collection, counters_collection, is_db_connected
+    try:
+        # Attempt to connect to MongoDB
+        client = AsyncIOMotorClient(MONGO_URI, **MONGO_CLIENT_OPTIONS)
+        # The ismaster command is cheap and does not require auth.
+        await client.admin.command('ismaster')
+
+        db = client[DATABASE_NAME]
+        links_collection = db["links"]
+        users_collection = db["users"]
+        counters_collection = db["counters"]
+
+        # Ensure a unique index for username
+        if 'username' not in await users_collection.index_information():
+            await users_collection.create_index("username", unique=True)
+
+        # Ensure a unique index for the random codes of older links (new links have none)
+        await links_collection.create_index("code", unique=True, sparse=True)
+
+        # Raise the counter to LINK_ID_START ($max is a no-op once it's past that)
+        await counters_collection.update_one({'_id': 'links'}, {'$max': {'seq': LINK_ID_START - 1}}, upsert=True)
+
+        is_db_connected = True
+        logger.info("Connected to MongoDB.")
+
+    except Exception as e:
+        # Logged at error level so it still shows up in your terminal, helping diagnose the 503 pages
+        logger.error("Failed to connect to MongoDB at %s. Please ensure MongoDB is running. Details: %s", MONGO_URI, e)
+        # is_db_connected remains False
+
+async def close_mongo():
+    """Closes the Mongo and Redis clients on shutdown."""
+    if client is not None:
+        client.close()
+    await redis_client.aclose()
+
+# Connections are opened lazily inside the running event loop. redis-py retries
+# 3 times with backoff by default; a missing socket should fail once, fast.
+redis_client = redis.asyncio.Redis(
+    unix_socket_path=REDIS_SOCKET,
+    decode_responses=True,
+    socket_timeout=0.5,
+    socket_connect_timeout=0.5,
+    retry=Retry(NoBackoff(), 0),
+)
+_redis_down_until = 0.0
+
+async def _cache_get(key):
+    """Reads from Redis, returning None if it is down or backing off."""
+    global _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return None
+    try:
+        return await redis_client.get(key)
+    except (redis.ConnectionError, redis.TimeoutError):
+        _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+    except redis.RedisError:
+        pass
+    return None
+
+async def _cache_set(key, value):
+    """Writes to Redis, silently skipping it if it is down or backing off."""
+    global _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return
+    try:
+        await redis_client.setex(key, REDIS_TTL, value)
+    except (redis.ConnectionError, redis.TimeoutError):
+        _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+    except redis.RedisError:
+        pass
 
 # --- 2. TEMPLATE SETUP ---
 
@@ -142,66 +241,184 @@ TEMPLATES_MAP = {
 # Create the Jinja Environment directly using DictLoader
 jinja_env = Environment(loader=DictLoader(TEMPLATES_MAP))
 
-# --- 3. FASTAPI SETUP & UTILS ---
+# Resolve every template once at import so requests skip the loader lookup
+HOME_TPL = jinja_env.get_template("home.html")
+REGISTER_TPL = jinja_env.get_template("register.html")
+LOGIN_TPL = jinja_env.get_template("login.html")
+DB_ERROR_TPL = jinja_env.get_template("db_error.html")
 
-app = FastAPI(title="FastAPI URL Shortener")
-flash_messages = {} 
+# MONGO_URI never changes, so the error page only needs rendering (and encoding) once
+DB_ERROR_BYTES = DB_ERROR_TPL.render(mongo_uri=MONGO_URI).encode("utf-8")
 
-def generate_code(length=5):
-    """Generates a random 5-character short code."""
-    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+# Same body HTTPException(404, "URL not found") would produce, serialized once
+NOT_FOUND_BYTES = b'{"detail":"URL not found"}'
 
-def set_flash_message(session_id: str, category: str, message: str):
-    """Stores a message to be displayed on the next request."""
-    if session_id not in flash_messages:
-        flash_messages[session_id] = []
-    flash_messages[session_id].append((category, message))
+# Pre-rendered pages for the common case: anonymous visitor, no flash messages
+_HOME_ANON_BYTES = HOME_TPL.render({"username": None, "messages": []}).encode("utf-8")
+_REGISTER_ANON_BYTES = REGISTER_TPL.render({"messages": []}).encode("utf-8")
+_LOGIN_ANON_BYTES = LOGIN_TPL.render({"messages": []}).encode("utf-8")
 
-def get_flash_messages(session_id: str):
-    """Retrieves and clears messages for the current session."""
-    messages = flash_messages.get(session_id, [])
-    if session_id in flash_messages:
-        del flash_messages[session_id]
-    return messages
+# --- 3. FASTAPI SETUP & UTILS ---
+
+app = FastAPI(title="FastAPI URL Shortener", on_startup=[connect_to_mongo], on_shutdown=[close_mongo])
+
+# Flash messages live in a short-lived signed cookie, so no server-side state is needed
+FLASH_COOKIE = "_flash"
+_flash_signer = URLSafeSerializer(SECRET_KEY, salt="flash")
+
+# The session cookie carries the username signed with a timestamp, so checking
+# it is a local HMAC verification rather than a database lookup
+SESSION_COOKIE = "username_session"
+SESSION_MAX_AGE = 3600
+_session_signer = TimestampSigner(SECRET_KEY, salt="session")
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+def encode_base62(n):
+    """Encodes a non-negative integer id as a short code."""
+    out = []
+    while n:
+        n, r = divmod(n, 62)
+        out.append(BASE62_ALPHABET[r])
+    return "".join(reversed(out)) or "0"
+
+def decode_base62(code):
+    """Decodes a short code back to its integer id, raising ValueError if it isn't one."""
+    n = 0
+    for char in code:
+        n = n * 62 + BASE62_ALPHABET.index(char)
+    # Anything past a signed 64-bit int can't be a link id (and can't be sent as BSON)
+    if n >= 2 ** 63:
+        raise ValueError(code)
+    return n
+
+async def next_link_id():
+    """Atomically allocates the next link id from the counters collection."""
+    counter = await counters_collection.find_one_and_update(
+        {'_id': 'links'},
+        {'$inc': {'seq': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['seq']
+
+def _calibrate_bcrypt_rounds(target_seconds=0.25):
+    """Picks the largest bcrypt cost (10-14) whose hash still fits in target_seconds."""
+    rounds = 10
+    for candidate in range(10, 15):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds=candidate))
+        if time.perf_counter() - start > target_seconds:
+            break
+        rounds = candidate
+    return rounds
+
+BCRYPT_ROUNDS = _calibrate_bcrypt_rounds()
+
+def hash_password(password):
+    """Hashes a password with bcrypt at the calibrated cost."""
+    # bcrypt only looks at the first 72 bytes; truncate explicitly so newer
+    # bcrypt releases don't raise on long passwords
+    return bcrypt.hashpw(password.encode()[:72], bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+def verify_password(stored_hash, password):
+    """Checks a password in constant time, accepting legacy werkzeug hashes."""
+    if stored_hash.startswith("$2"):
+        return bcrypt.checkpw(password.encode()[:72], stored_hash.encode())
+    # Accounts registered before the switch to bcrypt
+    return check_password_hash(stored_hash, password)
+
+# Verified against when the username doesn't exist, so a miss costs as much as a hit
+DUMMY_HASH = hash_password("x")
+
+# functools.lru_cache cannot wrap a coroutine, so keep a small LRU by hand.
+# Only the event loop thread touches it, so no lock is needed.
+_RESOLVE_CACHE_SIZE = 10000
+_resolve_cache = OrderedDict()
+
+def _remember(code, long_url):
+    """Adds a resolved code to the in-process LRU, evicting the oldest entry if full."""
+    _resolve_cache[code] = long_url
+    if len(_resolve_cache) > _RESOLVE_CACHE_SIZE:
+        _resolve_cache.popitem(last=False)
+    return long_url
+
+async def _resolve(code):
+    """Looks up the long URL for a short code, caching hits in-process."""
+    long_url = _resolve_cache.get(code)
+    if long_url is not None:
+        _resolve_cache.move_to_end(code)
+        return long_url
+
+    # Shared cache first; if Redis is down just fall through to Mongo
+    cache_key = f"c:{code}"
+    long_url = await _cache_get(cache_key)
+    if long_url is not None:
+        return _remember(code, long_url)
+
+    # New links are keyed by the integer id encoded in the code, which hits the _id index
+    mapping = None
+    try:
+        link_id = decode_base62(code)
+    except ValueError:
+        link_id = None
+    # Only the canonical encoding is an id: "0001" or any old 5-character code
+    # must not be read as the id it happens to decode to
+    if link_id is not None and encode_base62(link_id) == code:
+        mapping = await links_collection.find_one({'_id': link_id}, projection={'long_url': 1, '_id': 0})
+    if mapping is None:
+        # Links created before the switch to ids still carry a random code
+        mapping = await links_collection.find_one({'code': code}, projection={'long_url': 1, '_id': 0})
+    if mapping is None:
+        # Raise instead of returning None so misses are never cached
+        raise KeyError(code)
+
+    await _cache_set(cache_key, mapping['long_url'])
+    return _remember(code, mapping['long_url'])
+
+def set_flash_message(response: Response, category: str, message: str):
+    """Attaches a message to the response, to be displayed on the next request."""
+    response.set_cookie(FLASH_COOKIE, _flash_signer.dumps([(category, message)]), max_age=30, httponly=True)
+
+def get_flash_messages(request: Request):
+    """Reads the messages from the flash cookie, ignoring tampered values."""
+    cookie = request.cookies.get(FLASH_COOKIE)
+    if not cookie:
+        return []
+    try:
+        return _flash_signer.loads(cookie)
+    except BadSignature:
+        return []
 
 # Helper to render templates
-def render(request: Request, template_name: str, context: dict, status_code: int = 200):
-    """Helper function to render a template using the direct Jinja environment."""
-    template = jinja_env.get_template(template_name)
-    
+def render(request: Request, template: Template, context: dict, status_code: int = 200):
+    """Helper function to render one of the precompiled module templates."""
     # Context is just the dictionary of data needed by the template.
-    content = template.render(context)
-    return HTMLResponse(content, status_code=status_code)
+    # Encode here so the response body is written as-is instead of re-encoded.
+    content = template.render(context).encode('utf-8')
+    return Response(content=content, media_type='text/html', status_code=status_code)
 
 
 # Middleware to check DB connection for ALL routes
 def check_db_connection(request: Request):
-    """If DB connection fails, returns a 503 HTMLResponse, otherwise returns None."""
+    """If DB connection fails, returns a pre-rendered 503 response, otherwise returns None."""
     if not is_db_connected:
-        db_error_template = jinja_env.get_template("db_error.html")
-        
-        # Note: We must pass 'mongo_uri' explicitly here for the error template.
-        content = db_error_template.render(mongo_uri=MONGO_URI)
-        return HTMLResponse(content, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(content=DB_ERROR_BYTES, media_type="text/html", status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
     return None
 
 # --- 4. AUTHENTICATION DEPENDENCY ---
 
-def get_current_user(request: Request):
+async def get_current_user(request: Request):
     """Retrieves the current user's username from a cookie."""
-    # This is a synchronous function (no 'async def')
     if not is_db_connected:
         return None
         
-    username = request.cookies.get("username_session")
-    if username:
+    cookie = request.cookies.get(SESSION_COOKIE)
+    if cookie:
         try:
-            # We check the database to ensure the user still exists
-            user_data = users_collection.find_one({"username": username})
-            if user_data:
-                return username
-        except Exception:
-            # Handle DB error during query (e.g., connection dropped)
+            return _session_signer.unsign(cookie, max_age=SESSION_MAX_AGE).decode()
+        except BadSignature:
+            # Tampered or expired cookie (SignatureExpired is a BadSignature)
             pass
     return None 
 
@@ -214,12 +431,12 @@ def get_current_user_required(request: Request, username: str = Depends(get_curr
             raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
         # Otherwise, redirect to login page for unauthenticated access
-        session_id = request.client.host
-        set_flash_message(session_id, 'info', 'Please log in to access this page.')
+        response = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+        set_flash_message(response, 'info', 'Please log in to access this page.')
         raise HTTPException(
             status_code=status.HTTP_303_SEE_OTHER,
             detail="Not authenticated",
-            headers={"Location": "/login"}
+            headers={"Location": "/login", "Set-Cookie": response.headers["set-cookie"]}
         )
     return username
 
@@ -229,25 +446,24 @@ def get_current_user_required(request: Request, username: str = Depends(get_curr
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request, username: str = Depends(get_current_user)):
     """Main homepage: checks DB connection first."""
-    
-    # --- DEBUGGING PRINT ---
-    print("--- DEBUG: Attempting to render HOME page ---")
-    # --- DEBUGGING PRINT ---
 
     # Run DB check middleware explicitly for routes that don't need required auth
     db_response = check_db_connection(request)
     if db_response:
         return db_response
         
-    session_id = request.client.host
-    messages = get_flash_messages(session_id)
+    messages = get_flash_messages(request)
+    if not messages and not username:
+        return HTMLResponse(content=_HOME_ANON_BYTES)
     
     # Use the simple render helper
-    return render(
+    response = render(
         request,
-        "home.html", 
+        HOME_TPL,
         {"username": username, "messages": messages}
     )
+    response.delete_cookie(FLASH_COOKIE)
+    return response
 
 # --- Register Routes ---
 @app.get("/register", response_class=HTMLResponse)
@@ -255,41 +471,43 @@ async def register_get(request: Request):
     db_response = check_db_connection(request)
     if db_response: return db_response
     
-    session_id = request.client.host
-    
-    # FIX: Removed 'await' since get_current_user is a synchronous function
-    if get_current_user(request):
+    if await get_current_user(request):
         return RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
         
-    messages = get_flash_messages(session_id)
+    messages = get_flash_messages(request)
+    if not messages:
+        return HTMLResponse(content=_REGISTER_ANON_BYTES)
 
     # Use the simple render helper
-    return render(
+    response = render(
         request,
-        "register.html", 
+        REGISTER_TPL,
         {"messages": messages}
     )
+    response.delete_cookie(FLASH_COOKIE)
+    return response
 
 @app.post("/register", response_class=RedirectResponse, status_code=status.HTTP_303_SEE_OTHER)
 async def register_post(request: Request):
     db_response = check_db_connection(request)
     if db_response: return db_response
     
-    session_id = request.client.host
-    
     form = await request.form()
     username = form.get('username')
     password = form.get('password')
 
-    if users_collection.find_one({"username": username}):
-        set_flash_message(session_id, 'error', 'Username already taken!')
-        return RedirectResponse(url="/register", status_code=status.HTTP_303_SEE_OTHER)
+    if await users_collection.find_one({"username": username}):
+        response = RedirectResponse(url="/register", status_code=status.HTTP_303_SEE_OTHER)
+        set_flash_message(response, 'error', 'Username already taken!')
+        return response
     else:
-        hashed_password = generate_password_hash(password)
-        users_collection.insert_one({"username": username, "password": hashed_password})
+        # Hashing is deliberately slow, so keep it off the event loop
+        hashed_password = await asyncio.to_thread(hash_password, password)
+        await users_collection.insert_one({"username": username, "password": hashed_password})
         
-        set_flash_message(session_id, 'success', 'Registration successful. Please log in.')
-        return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+        response = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+        set_flash_message(response, 'success', 'Registration successful. Please log in.')
+        return response
 
 
 # --- Login Routes ---
@@ -298,47 +516,49 @@ async def login_get(request: Request):
     db_response = check_db_connection(request)
     if db_response: return db_response
     
-    session_id = request.client.host
-    
-    # FIX: Removed 'await' since get_current_user is a synchronous function
-    if get_current_user(request):
+    if await get_current_user(request):
         return RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
 
-    messages = get_flash_messages(session_id)
+    messages = get_flash_messages(request)
+    if not messages:
+        return HTMLResponse(content=_LOGIN_ANON_BYTES)
 
     # Use the simple render helper
-    return render(
+    response = render(
         request,
-        "login.html", 
+        LOGIN_TPL,
         {"messages": messages}
     )
+    response.delete_cookie(FLASH_COOKIE)
+    return response
 
 @app.post("/login")
 async def login_post(request: Request):
     db_response = check_db_connection(request)
     if db_response: return db_response
     
-    session_id = request.client.host
-    
     form = await request.form()
     username = form.get('username')
     password = form.get('password')
-    user_data = users_collection.find_one({"username": username})
+    user_data = await users_collection.find_one({"username": username})
+    stored_hash = user_data['password'] if user_data else DUMMY_HASH
 
-    if user_data and check_password_hash(user_data['password'], password):
+    if await asyncio.to_thread(verify_password, stored_hash, password) and user_data:
         response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
-        response.set_cookie(key="username_session", value=username, httponly=True, max_age=3600) 
-        set_flash_message(session_id, 'success', 'Logged in successfully!')
+        session_token = _session_signer.sign(username.encode()).decode()
+        response.set_cookie(key=SESSION_COOKIE, value=session_token, httponly=True, max_age=SESSION_MAX_AGE)
+        set_flash_message(response, 'success', 'Logged in successfully!')
         return response
     else:
-        set_flash_message(session_id, 'error', 'Invalid username or password')
-        return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+        response = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+        set_flash_message(response, 'error', 'Invalid username or password')
+        return response
 
 
 @app.get("/logout")
 async def logout():
     response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
-    response.delete_cookie("username_session")
+    response.delete_cookie(SESSION_COOKIE)
     return response
 
 
@@ -349,30 +569,27 @@ async def shorten(request: Request, username: str = Depends(get_current_user_req
     """Creates a new short URL (protected by authentication)."""
     # DB check is handled by the required dependency
     
-    session_id = request.client.host
     form = await request.form()
     long_url = form.get("url")
     
     if not long_url:
-        set_flash_message(session_id, 'error', "URL parameter missing")
-        return RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
-
-    code = generate_code()
-    while links_collection.find_one({'code': code}):
-        code = generate_code()
+        response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
+        set_flash_message(response, 'error', "URL parameter missing")
+        return response
 
-    link_document = {
-        'code': code,
+    link_id = await next_link_id()
+    await links_collection.insert_one({
+        '_id': link_id,
         'long_url': long_url,
         'created_by': username
-    }
-    links_collection.insert_one(link_document)
-    
-    # We call request.url_for here where we need it, but we don't pass 'request' to the template context
-    short_link = request.url_for('redirect_to_url', code=code)
+    })
+    code = encode_base62(link_id)
+
+    short_link = f"{BASE_URL}{code}"
 
-    set_flash_message(session_id, 'success', f'Short URL created: <a href="{short_link}">{short_link}</a>')
-    return RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
+    response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
+    set_flash_message(response, 'success', f'Short URL created: <a href="{short_link}">{short_link}</a>')
+    return response
 
 
 @app.get('/{code}', response_class=RedirectResponse)
@@ -381,14 +598,21 @@ async def redirect_to_url(request: Request, code: str):
     db_response = check_db_connection(request)
     if db_response: return db_response
     
-    mapping = links_collection.find_one({'code': code})
-    if mapping:
-        return RedirectResponse(url=mapping['long_url'], status_code=status.HTTP_302_FOUND)
-        
-    raise HTTPException(status_code=404, detail="URL not found")
+    try:
+        long_url = await _resolve(code)
+    except KeyError:
+        return Response(content=NOT_FOUND_BYTES, media_type="application/json", status_code=status.HTTP_404_NOT_FOUND)
+
+    # Links are never edited or deleted, so let browsers and proxies cache the redirect
+    return RedirectResponse(
+        url=long_url,
+        status_code=status.HTTP_301_MOVED_PERMANENTLY,
+        headers={"Cache-Control": REDIRECT_CACHE_CONTROL}
+    )
 
 
 # --- 7. RUN SERVER INSTRUCTIONS ---
 
 if __name__ == "__main__":
+    print("Development server only. In production run: uvicorn fastapi_shortener:app --workers 4 --no-access-log")
     uvicorn.run("fastapi_shortener:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,46 @@
+# Gunicorn settings for the Flask apps (Url_Shortner.py / autentication.py)
+#
+#   gunicorn -c gunicorn.conf.py Url_Shortner:app
+#   gunicorn -c gunicorn.conf.py autentication:app
+#
+# The FastAPI app is ASGI and runs under uvicorn instead:
+#
+#   uvicorn fastapi_shortener:app --workers 4 --no-access-log
+
+# Patch the stdlib before the app (and pymongo/ssl) is preloaded below
+from gevent import monkey
+monkey.patch_all()
+
+import multiprocessing
+import sys
+
+# Same port as the Flask dev server, so the default BASE_URL in the apps matches
+bind = "127.0.0.1:5000"
+
+# The workload is I/O bound (waiting on MongoDB), so use many cooperative workers
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_class = "gevent"
+worker_connections = 1000
+
+preload_app = True
+
+APP_MODULES = ("Url_Shortner", "autentication")
+
+
+def when_ready(server):
+    # The master only needed Mongo to preload the app (index and counter
+    # setup). Close its client before any worker forks so it doesn't hold the
+    # minPoolSize connections and monitor threads, or pass their sockets on.
+    for name in APP_MODULES:
+        module = sys.modules.get(name)
+        if module is not None:
+            module.client.close()
+
+
+def post_fork(server, worker):
+    # MongoClient is not fork-safe, so each worker builds its own instead of
+    # inheriting the one created while the app was preloaded in the master
+    for name in APP_MODULES:
+        module = sys.modules.get(name)
+        if module is not None:
+            module.connect_to_mongo()